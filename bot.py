@@ -771,13 +771,11 @@ async def handle_token(update: Update, context: ContextTypes.DEFAULT_TYPE):
         
         bot_username = bot_info.username
         
-        existing_bot = db.get_bot_by_username(bot_username)
-        if existing_bot:
+        if db.bot_username_exists(bot_username):
             await message.reply_text(f"※ هذا البوت (@{bot_username}) مصنوع من قبل!\nلا يمكن إنشاء نفس البوت مرتين")
             return
         
-        existing_token = db.get_bot_by_token(token)
-        if existing_token:
+        if db.bot_token_exists(token):
             await message.reply_text("※ هذا التوكن مستخدم من قبل!")
             return
         
@@ -1466,16 +1464,14 @@ async def handle_developer_message(update: Update, context: ContextTypes.DEFAULT
         for bot_data in bots_list:
             token = bot_data.get('token', '')
             if token[:25] in selected_bots:
-                bot_users = db.get_bot_users(token)
                 try:
                     child_bot = Bot(token=token)
-                    for bot_user in bot_users:
-                        if not bot_user.get('banned'):
-                            try:
-                                await child_bot.send_message(chat_id=bot_user['user_id'], text=message.text)
-                                total_success += 1
-                            except:
-                                total_failed += 1
+                    for bot_user_id in db.iter_bot_user_ids(token):
+                        try:
+                            await child_bot.send_message(chat_id=bot_user_id, text=message.text)
+                            total_success += 1
+                        except:
+                            total_failed += 1
                     log_broadcast("Advanced", total_success, total_failed, bot_data.get('bot_username'))
                 except Exception as e:
                     log_error("Advanced Broadcast", e, f"Token: {token[:20]}...")
@@ -4209,8 +4205,7 @@ async def start_sticker_bot(token: str, owner_id: int):
                 return
             first_name = user.first_name or "صديقي"
             
-            bot_data = db.get_bot_by_token(token)
-            owner_name = bot_data.get('owner_name', first_name) if bot_data else first_name
+            owner_name = first_name
             
             db.add_bot_user(token, user.id, first_name, user.username)
             
@@ -4261,7 +4256,6 @@ async def start_sticker_bot(token: str, owner_id: int):
                     await query.answer("للمالك فقط", show_alert=True)
                     return
                 
-                bot_data = db.get_bot_by_token(token)
                 bot_users = db.get_bot_users(token)
                 total_users = len(bot_users)
                 active_users = len([u for u in bot_users if not u.get('banned')])
@@ -4333,8 +4327,7 @@ async def start_sticker_bot(token: str, owner_id: int):
             
             if data == "sticker_back":
                 sticker_user_states.pop(user.id, None)
-                bot_data = db.get_bot_by_token(token)
-                owner_name = bot_data.get('owner_name', first_name) if bot_data else first_name
+                owner_name = first_name
                 
                 if user.id == owner_id or is_developer_user(user.id, user.username):
                     keyboard = [
@@ -4379,17 +4372,15 @@ async def start_sticker_bot(token: str, owner_id: int):
             user_state = sticker_user_states.get(user.id, {})
             
             if user_state.get('broadcasting') and (user.id == owner_id or is_developer_user(user.id, user.username)):
-                bot_users = db.get_bot_users(token)
                 success = 0
                 failed = 0
                 child_bot = Bot(token=token)
-                for bot_user in bot_users:
-                    if not bot_user.get('banned'):
-                        try:
-                            await child_bot.send_message(chat_id=bot_user['user_id'], text=message.text)
-                            success += 1
-                        except:
-                            failed += 1
+                for bot_user_id in db.iter_bot_user_ids(token):
+                    try:
+                        await child_bot.send_message(chat_id=bot_user_id, text=message.text)
+                        success += 1
+                    except:
+                        failed += 1
                 await message.reply_text(f"✅ تم الإرسال\nنجح: {success}\nفشل: {failed}")
                 sticker_user_states.pop(user.id, None)
                 log_broadcast("Sticker Bot", success, failed)
@@ -4594,6 +4585,7 @@ async def main():
         return
     
     ensure_data_dir()
+    db.init_database()
     
     if not os.path.exists(MEMBER_FILE):
         save_member_data({})
@@ -4606,6 +4598,14 @@ async def main():
     if not main_scheduler.running:
         main_scheduler.start()
     
+    main_scheduler.add_job(
+        db.maintenance_tick,
+        'interval',
+        minutes=db.MAINTENANCE_INTERVAL_MINUTES,
+        id="db_maintenance",
+        replace_existing=True
+    )
+    
     restore_schedules()
     await restore_bots()
     
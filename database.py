@@ -6,26 +6,119 @@ Uses SQLite for data storage with full CRUD operations
 import sqlite3
 import json
 import os
-from datetime import datetime
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Iterable, Iterator, Tuple
 import logging
+import threading
+import atexit
+import time
+from functools import lru_cache
 
 logger = logging.getLogger(__name__)
 
 DATABASE_PATH = "data/bot_factory.db"
+os.makedirs(os.path.dirname(DATABASE_PATH), exist_ok=True)
+
+# Hot-path statements, shared so every call hits the connection's statement cache
+SQL_GET_BOT_BY_TOKEN = 'SELECT * FROM bots WHERE token = ?'
+SQL_IS_BOT_USER_BANNED = 'SELECT banned FROM bot_users WHERE bot_token = ? AND user_id = ?'
+SQL_IS_DEVELOPER = 'SELECT 1 FROM developers WHERE user_id = ?'
+SQL_IS_MAKER_BANNED = 'SELECT 1 FROM banned_makers WHERE user_id = ?'
+SQL_GET_FAKE_SUB = 'SELECT enabled, message FROM fake_subs WHERE bot_token = ?'
+SQL_GET_GUARD_SETTINGS = 'SELECT kick_limit FROM guard_settings WHERE bot_token = ? AND chat_id = ?'
+SQL_ADD_BOT_USER = '''
+    INSERT OR IGNORE INTO bot_users (bot_token, user_id, first_name, username, joined_at)
+    VALUES (?, ?, ?, ?, strftime('%Y-%m-%dT%H:%M:%f', 'now', 'localtime'))
+'''
+# Keyset pages for broadcasts: each page is fetched fully before the caller awaits
+BOT_USERS_PAGE_SIZE = 500
+SQL_PAGE_ACTIVE_BOT_USER_IDS = '''
+    SELECT id, user_id FROM bot_users
+    WHERE bot_token = ? AND banned = 0 AND id > ?
+    ORDER BY id LIMIT ?
+'''
+SQL_ADD_MEMORY = '''
+    INSERT INTO remember (bot_token, user_id, role, content, created_at)
+    VALUES (?, ?, ?, ?, strftime('%Y-%m-%dT%H:%M:%f', 'now', 'localtime'))
+'''
+# Keep only the latest 20 messages: drop everything at or below the 21st newest id
+SQL_TRIM_MEMORY = '''
+    DELETE FROM remember WHERE bot_token = ? AND user_id = ? AND id <= (
+        SELECT id FROM remember WHERE bot_token = ? AND user_id = ?
+        ORDER BY id DESC LIMIT 1 OFFSET 20
+    )
+'''
+SQL_GET_MEMORY = '''
+    SELECT role, content FROM remember
+    WHERE bot_token = ? AND user_id = ?
+    ORDER BY id DESC LIMIT ?
+'''
+
+# Read-mostly lookups are memoized; writers clear the matching cache
+READ_CACHE_SIZE = 4096
+BANNED_CACHE_SIZE = 10000
+BANNED_CACHE_TTL = 60
+
+# Periodic maintenance: passive WAL checkpoint every tick, sampled ANALYZE at most hourly
+MAINTENANCE_INTERVAL_MINUTES = 5
+# WAL size (in pages) above which a tick escalates to a blocking TRUNCATE checkpoint
+WAL_TRUNCATE_PAGES = 4000
+ANALYZE_INTERVAL = 60 * 60
+# Rows sampled per index by the periodic ANALYZE
+ANALYSIS_LIMIT = 400
+
+# Bump whenever _create_schema changes so existing databases pick it up
+SCHEMA_VERSION = 2
+
+_wal_enabled = False
+_initialized = False
+_init_lock = threading.Lock()
+_local = threading.local()
+_banned_cache: Dict[Tuple[str, int], Tuple[float, bool]] = {}
+_last_analyze: Optional[float] = None
+
+def _open_connection():
+    """Open a new tuned database connection"""
+    global _wal_enabled
+    conn = sqlite3.connect(DATABASE_PATH, cached_statements=256)
+    conn.row_factory = sqlite3.Row
+    # journal_mode is persisted in the database file, the rest is per connection
+    if not _wal_enabled:
+        conn.execute('PRAGMA journal_mode=WAL')
+        _wal_enabled = True
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute('PRAGMA temp_store=MEMORY')
+    conn.execute('PRAGMA cache_size=-64000')
+    conn.execute('PRAGMA mmap_size=268435456')
+    conn.execute('PRAGMA busy_timeout=5000')
+    return conn
 
 def get_connection():
-    """Get database connection"""
-    os.makedirs("data", exist_ok=True)
-    conn = sqlite3.connect(DATABASE_PATH)
-    conn.row_factory = sqlite3.Row
+    """Get the database connection owned by the current thread"""
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        conn = _open_connection()
+        _local.conn = conn
     return conn
 
 def init_database():
-    """Initialize database tables"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
+    """Initialize database tables (once per process, skipped when the schema is current)"""
+    global _initialized
+    with _init_lock:
+        if _initialized:
+            return
+        conn = get_connection()
+        cursor = conn.cursor()
+        cursor.execute('PRAGMA user_version')
+        if cursor.fetchone()[0] < SCHEMA_VERSION:
+            _create_schema(cursor)
+            cursor.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+            conn.commit()
+            logger.info("Database initialized successfully")
+        atexit.register(optimize_database)
+        _initialized = True
+
+def _create_schema(cursor: sqlite3.Cursor):
+    """Create tables, indexes and triggers"""
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS members (
             user_id INTEGER PRIMARY KEY,
@@ -100,6 +193,8 @@ def init_database():
         )
     ''')
     
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_remember_bt_uid_id ON remember (bot_token, user_id, id)')
+    
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS adhkar_schedules (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -131,9 +226,91 @@ def init_database():
         )
     ''')
     
-    conn.commit()
-    conn.close()
-    logger.info("Database initialized successfully")
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_bots_username ON bots (bot_username)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_bots_type ON bots (bot_type)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_bots_owner ON bots (owner_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_bots_users_count ON bots (users_count DESC)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_bot_users_bt_banned ON bot_users (bot_token, banned)')
+    # AI memory is read and trimmed by id; the old created_at index is dead weight on every write
+    cursor.execute('DROP INDEX IF EXISTS idx_remember_bt_uid_created')
+    
+    # Keep bots.users_count (non-banned users) in sync with bot_users
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'trg_bot_users_insert'")
+    counter_triggers_exist = cursor.fetchone() is not None
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_bot_users_insert AFTER INSERT ON bot_users
+        WHEN NEW.banned = 0
+        BEGIN
+            UPDATE bots SET users_count = users_count + 1 WHERE token = NEW.bot_token;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_bot_users_ban AFTER UPDATE OF banned ON bot_users
+        WHEN NEW.banned != OLD.banned
+        BEGIN
+            UPDATE bots SET users_count = users_count + (CASE WHEN NEW.banned = 0 THEN 1 ELSE -1 END)
+            WHERE token = NEW.bot_token;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_bot_users_delete AFTER DELETE ON bot_users
+        WHEN OLD.banned = 0
+        BEGIN
+            UPDATE bots SET users_count = users_count - 1 WHERE token = OLD.bot_token;
+        END
+    ''')
+    if not counter_triggers_exist:
+        cursor.execute('''
+            UPDATE bots SET users_count = (
+                SELECT COUNT(*) FROM bot_users WHERE bot_token = bots.token AND banned = 0
+            )
+        ''')
+    
+    # Deleting a bot removes its users, fake subscription and AI memory
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_bots_delete AFTER DELETE ON bots
+        BEGIN
+            DELETE FROM bot_users WHERE bot_token = OLD.token;
+            DELETE FROM fake_subs WHERE bot_token = OLD.token;
+            DELETE FROM remember WHERE bot_token = OLD.token;
+        END
+    ''')
+    
+    # Gather planner statistics the first time the indexes exist
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'")
+    if cursor.fetchone() is None:
+        cursor.execute('ANALYZE')
+
+def optimize_database():
+    """Refresh query planner statistics before shutdown"""
+    try:
+        get_connection().execute('PRAGMA optimize')
+    except Exception as e:
+        logger.error(f"Error optimizing database: {e}")
+
+def maintenance_tick():
+    """Checkpoint the WAL and, at most once per ANALYZE_INTERVAL, re-gather planner statistics
+    
+    Ordinary ticks use a PASSIVE checkpoint, which never blocks other connections. Only when
+    the WAL has grown past WAL_TRUNCATE_PAGES does it run TRUNCATE, which holds off new writers
+    while it waits for readers; like the hourly ANALYZE (which takes the write lock), that can
+    stall a writer on the event loop for up to its busy_timeout (5 s).
+    """
+    global _last_analyze
+    try:
+        conn = get_connection()
+        busy, wal_pages, checkpointed = conn.execute('PRAGMA wal_checkpoint(PASSIVE)').fetchone()
+        if wal_pages > WAL_TRUNCATE_PAGES:
+            conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        now = time.monotonic()
+        if _last_analyze is None or now - _last_analyze >= ANALYZE_INTERVAL:
+            # PRAGMA optimize only considers tables this connection has queried, and the
+            # scheduler's worker connection has queried none, so run a bounded ANALYZE instead
+            conn.execute(f'PRAGMA analysis_limit = {ANALYSIS_LIMIT}')
+            conn.execute('ANALYZE')
+            _last_analyze = now
+    except Exception as e:
+        logger.error(f"Error running database maintenance: {e}")
 
 
 # ============== MEMBERS ==============
@@ -143,15 +320,15 @@ def add_member(user_id: int, first_name: str, username: str = None):
     conn = get_connection()
     cursor = conn.cursor()
     try:
-        cursor.execute('''
-            INSERT OR REPLACE INTO members (user_id, first_name, username, joined_at, bots_created)
-            VALUES (?, ?, ?, ?, COALESCE((SELECT bots_created FROM members WHERE user_id = ?), 0))
-        ''', (user_id, first_name, username, datetime.now().isoformat(), user_id))
-        conn.commit()
+        with conn:
+            cursor.execute('''
+                INSERT INTO members (user_id, first_name, username, joined_at, bots_created)
+                VALUES (?, ?, ?, strftime('%Y-%m-%dT%H:%M:%f', 'now', 'localtime'), 0)
+                ON CONFLICT(user_id)
+                DO UPDATE SET first_name = excluded.first_name, username = excluded.username
+            ''', (user_id, first_name, username))
     except Exception as e:
         logger.error(f"Error adding member: {e}")
-    finally:
-        conn.close()
 
 def get_member(user_id: int) -> Optional[Dict]:
     """Get member by user_id"""
@@ -159,7 +336,6 @@ def get_member(user_id: int) -> Optional[Dict]:
     cursor = conn.cursor()
     cursor.execute('SELECT * FROM members WHERE user_id = ?', (user_id,))
     row = cursor.fetchone()
-    conn.close()
     return dict(row) if row else None
 
 def get_all_members() -> List[Dict]:
@@ -168,16 +344,14 @@ def get_all_members() -> List[Dict]:
     cursor = conn.cursor()
     cursor.execute('SELECT * FROM members')
     rows = cursor.fetchall()
-    conn.close()
     return [dict(row) for row in rows]
 
 def increment_bots_created(user_id: int):
     """Increment bots_created counter for a member"""
     conn = get_connection()
     cursor = conn.cursor()
-    cursor.execute('UPDATE members SET bots_created = bots_created + 1 WHERE user_id = ?', (user_id,))
-    conn.commit()
-    conn.close()
+    with conn:
+        cursor.execute('UPDATE members SET bots_created = bots_created + 1 WHERE user_id = ?', (user_id,))
 
 
 # ============== BOTS ==============
@@ -187,11 +361,11 @@ def add_bot(token: str, bot_username: str, bot_type: str, owner_id: int, require
     conn = get_connection()
     cursor = conn.cursor()
     try:
-        cursor.execute('''
-            INSERT INTO bots (token, bot_username, bot_type, owner_id, created_at, required_channel)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (token, bot_username, bot_type, owner_id, datetime.now().isoformat(), required_channel))
-        conn.commit()
+        with conn:
+            cursor.execute('''
+                INSERT INTO bots (token, bot_username, bot_type, owner_id, created_at, required_channel)
+                VALUES (?, ?, ?, ?, strftime('%Y-%m-%dT%H:%M:%f', 'now', 'localtime'), ?)
+            ''', (token, bot_username, bot_type, owner_id, required_channel))
         return True
     except sqlite3.IntegrityError:
         logger.warning(f"Bot already exists: {bot_username}")
@@ -199,25 +373,35 @@ def add_bot(token: str, bot_username: str, bot_type: str, owner_id: int, require
     except Exception as e:
         logger.error(f"Error adding bot: {e}")
         return False
-    finally:
-        conn.close()
 
 def get_bot_by_token(token: str) -> Optional[Dict]:
     """Get bot by token"""
     conn = get_connection()
     cursor = conn.cursor()
-    cursor.execute('SELECT * FROM bots WHERE token = ?', (token,))
+    cursor.execute(SQL_GET_BOT_BY_TOKEN, (token,))
     row = cursor.fetchone()
-    conn.close()
     return dict(row) if row else None
 
+def bot_token_exists(token: str) -> bool:
+    """Check if a bot with this token exists"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute('SELECT 1 FROM bots WHERE token = ?', (token,))
+    return cursor.fetchone() is not None
+
+def bot_username_exists(username: str) -> bool:
+    """Check if a bot with this username exists"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute('SELECT 1 FROM bots WHERE bot_username = ?', (username,))
+    return cursor.fetchone() is not None
+
 def get_bot_by_username(username: str) -> Optional[Dict]:
     """Get bot by username"""
     conn = get_connection()
     cursor = conn.cursor()
     cursor.execute('SELECT * FROM bots WHERE bot_username = ?', (username,))
     row = cursor.fetchone()
-    conn.close()
     return dict(row) if row else None
 
 def get_all_bots() -> List[Dict]:
@@ -226,7 +410,6 @@ def get_all_bots() -> List[Dict]:
     cursor = conn.cursor()
     cursor.execute('SELECT * FROM bots')
     rows = cursor.fetchall()
-    conn.close()
     return [dict(row) for row in rows]
 
 def get_bots_by_type(bot_type: str) -> List[Dict]:
@@ -235,45 +418,43 @@ def get_bots_by_type(bot_type: str) -> List[Dict]:
     cursor = conn.cursor()
     cursor.execute('SELECT * FROM bots WHERE bot_type = ?', (bot_type,))
     rows = cursor.fetchall()
-    conn.close()
     return [dict(row) for row in rows]
 
-def toggle_bot_active(token: str) -> bool:
-    """Toggle bot active status"""
+def toggle_bot_active(token: str) -> Optional[bool]:
+    """Toggle bot active status and return the new status (None if the bot doesn't exist)"""
     conn = get_connection()
     cursor = conn.cursor()
-    cursor.execute('UPDATE bots SET active = NOT active WHERE token = ?', (token,))
-    conn.commit()
-    affected = cursor.rowcount
-    conn.close()
-    return affected > 0
+    with conn:
+        cursor.execute('UPDATE bots SET active = NOT active WHERE token = ? RETURNING active', (token,))
+        row = cursor.fetchone()
+    return row['active'] == 1 if row else None
 
 def update_bot_channel(token: str, channel: str):
     """Update required channel for a bot"""
     conn = get_connection()
     cursor = conn.cursor()
-    cursor.execute('UPDATE bots SET required_channel = ? WHERE token = ?', (channel, token))
-    conn.commit()
-    conn.close()
+    with conn:
+        cursor.execute('UPDATE bots SET required_channel = ? WHERE token = ?', (channel, token))
 
-def update_bot_users_count(token: str, count: int):
-    """Update users count for a bot"""
+def update_bot_users_count(token: str):
+    """Recount non-banned users for a bot (the bot_users triggers keep it current otherwise)"""
     conn = get_connection()
     cursor = conn.cursor()
-    cursor.execute('UPDATE bots SET users_count = ? WHERE token = ?', (count, token))
-    conn.commit()
-    conn.close()
+    with conn:
+        cursor.execute('''
+            UPDATE bots SET users_count = (
+                SELECT COUNT(*) FROM bot_users WHERE bot_token = bots.token AND banned = 0
+            ) WHERE token = ?
+        ''', (token,))
 
 def delete_bot(token: str):
-    """Delete a bot"""
+    """Delete a bot (trg_bots_delete removes its users, fake sub and memory)"""
     conn = get_connection()
     cursor = conn.cursor()
-    cursor.execute('DELETE FROM bots WHERE token = ?', (token,))
-    cursor.execute('DELETE FROM bot_users WHERE bot_token = ?', (token,))
-    cursor.execute('DELETE FROM fake_subs WHERE bot_token = ?', (token,))
-    cursor.execute('DELETE FROM remember WHERE bot_token = ?', (token,))
-    conn.commit()
-    conn.close()
+    with conn:
+        cursor.execute('DELETE FROM bots WHERE token = ?', (token,))
+    _get_fake_sub.cache_clear()
+    _banned_cache.clear()
 
 
 # ============== BOT USERS ==============
@@ -283,19 +464,25 @@ def add_bot_user(bot_token: str, user_id: int, first_name: str, username: str =
     conn = get_connection()
     cursor = conn.cursor()
     try:
-        cursor.execute('''
-            INSERT OR IGNORE INTO bot_users (bot_token, user_id, first_name, username, joined_at)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (bot_token, user_id, first_name, username, datetime.now().isoformat()))
-        conn.commit()
-        cursor.execute('SELECT COUNT(*) FROM bot_users WHERE bot_token = ? AND banned = 0', (bot_token,))
-        count = cursor.fetchone()[0]
-        cursor.execute('UPDATE bots SET users_count = ? WHERE token = ?', (count, bot_token))
-        conn.commit()
+        # users_count is bumped by the trg_bot_users_insert trigger
+        with conn:
+            cursor.execute(SQL_ADD_BOT_USER, (bot_token, user_id, first_name, username))
     except Exception as e:
         logger.error(f"Error adding bot user: {e}")
-    finally:
-        conn.close()
+
+def add_bot_users_many(bot_token: str, users: Iterable[Tuple[int, str, Optional[str]]]) -> int:
+    """Add many (user_id, first_name, username) users to a bot in one transaction, return how many were new"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    rows = ((bot_token, user_id, first_name, username) for user_id, first_name, username in users)
+    added = 0
+    try:
+        with conn:
+            cursor.executemany(SQL_ADD_BOT_USER, rows)
+        added = cursor.rowcount
+    except Exception as e:
+        logger.error(f"Error adding bot users: {e}")
+    return added
 
 def get_bot_users(bot_token: str) -> List[Dict]:
     """Get all users of a bot"""
@@ -303,33 +490,54 @@ def get_bot_users(bot_token: str) -> List[Dict]:
     cursor = conn.cursor()
     cursor.execute('SELECT * FROM bot_users WHERE bot_token = ?', (bot_token,))
     rows = cursor.fetchall()
-    conn.close()
     return [dict(row) for row in rows]
 
+def iter_bot_user_ids(bot_token: str) -> Iterator[int]:
+    """Stream IDs of a bot's non-banned users in keyset pages, so no statement stays open between pages"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    last_id = 0
+    while True:
+        cursor.execute(SQL_PAGE_ACTIVE_BOT_USER_IDS, (bot_token, last_id, BOT_USERS_PAGE_SIZE))
+        rows = cursor.fetchall()
+        if not rows:
+            return
+        for row in rows:
+            yield row['user_id']
+        last_id = rows[-1]['id']
+
 def ban_bot_user(bot_token: str, user_id: int):
     """Ban a user from a bot"""
     conn = get_connection()
     cursor = conn.cursor()
-    cursor.execute('UPDATE bot_users SET banned = 1 WHERE bot_token = ? AND user_id = ?', (bot_token, user_id))
-    conn.commit()
-    conn.close()
+    with conn:
+        cursor.execute('UPDATE bot_users SET banned = 1 WHERE bot_token = ? AND user_id = ?', (bot_token, user_id))
+    _banned_cache.pop((bot_token, user_id), None)
 
 def unban_bot_user(bot_token: str, user_id: int):
     """Unban a user from a bot"""
     conn = get_connection()
     cursor = conn.cursor()
-    cursor.execute('UPDATE bot_users SET banned = 0 WHERE bot_token = ? AND user_id = ?', (bot_token, user_id))
-    conn.commit()
-    conn.close()
+    with conn:
+        cursor.execute('UPDATE bot_users SET banned = 0 WHERE bot_token = ? AND user_id = ?', (bot_token, user_id))
+    _banned_cache.pop((bot_token, user_id), None)
 
 def is_bot_user_banned(bot_token: str, user_id: int) -> bool:
-    """Check if user is banned from a bot"""
+    """Check if user is banned from a bot (cached for BANNED_CACHE_TTL seconds)"""
+    key = (bot_token, user_id)
+    now = time.monotonic()
+    cached = _banned_cache.get(key)
+    if cached and cached[0] > now:
+        return cached[1]
     conn = get_connection()
     cursor = conn.cursor()
-    cursor.execute('SELECT banned FROM bot_users WHERE bot_token = ? AND user_id = ?', (bot_token, user_id))
+    cursor.execute(SQL_IS_BOT_USER_BANNED, (bot_token, user_id))
     row = cursor.fetchone()
-    conn.close()
-    return row['banned'] == 1 if row else False
+    banned = row['banned'] == 1 if row else False
+    if len(_banned_cache) >= BANNED_CACHE_SIZE:
+        _banned_cache.clear()
+    _banned_cache[key] = (now + BANNED_CACHE_TTL, banned)
+    return banned
 
 
 # ============== DEVELOPERS ==============
@@ -339,26 +547,27 @@ def add_developer(user_id: int, username: str = None, added_by: int = None):
     conn = get_connection()
     cursor = conn.cursor()
     try:
-        cursor.execute('''
-            INSERT OR REPLACE INTO developers (user_id, username, added_at, added_by)
-            VALUES (?, ?, ?, ?)
-        ''', (user_id, username, datetime.now().isoformat(), added_by))
-        conn.commit()
+        with conn:
+            cursor.execute('''
+                INSERT INTO developers (user_id, username, added_at, added_by)
+                VALUES (?, ?, strftime('%Y-%m-%dT%H:%M:%f', 'now', 'localtime'), ?)
+                ON CONFLICT(user_id)
+                DO UPDATE SET username = excluded.username, added_at = excluded.added_at, added_by = excluded.added_by
+            ''', (user_id, username, added_by))
+        is_developer.cache_clear()
         return True
     except Exception as e:
         logger.error(f"Error adding developer: {e}")
         return False
-    finally:
-        conn.close()
 
 def remove_developer(user_id: int):
     """Remove a developer"""
     conn = get_connection()
     cursor = conn.cursor()
-    cursor.execute('DELETE FROM developers WHERE user_id = ?', (user_id,))
-    conn.commit()
+    with conn:
+        cursor.execute('DELETE FROM developers WHERE user_id = ?', (user_id,))
+    is_developer.cache_clear()
     affected = cursor.rowcount
-    conn.close()
     return affected > 0
 
 def get_all_developers() -> List[Dict]:
@@ -367,16 +576,15 @@ def get_all_developers() -> List[Dict]:
     cursor = conn.cursor()
     cursor.execute('SELECT * FROM developers')
     rows = cursor.fetchall()
-    conn.close()
     return [dict(row) for row in rows]
 
+@lru_cache(maxsize=READ_CACHE_SIZE)
 def is_developer(user_id: int) -> bool:
     """Check if user is a developer"""
     conn = get_connection()
     cursor = conn.cursor()
-    cursor.execute('SELECT 1 FROM developers WHERE user_id = ?', (user_id,))
+    cursor.execute(SQL_IS_DEVELOPER, (user_id,))
     row = cursor.fetchone()
-    conn.close()
     return row is not None
 
 
@@ -387,35 +595,36 @@ def ban_maker(user_id: int, banned_by: int = None):
     conn = get_connection()
     cursor = conn.cursor()
     try:
-        cursor.execute('''
-            INSERT OR REPLACE INTO banned_makers (user_id, banned_at, banned_by)
-            VALUES (?, ?, ?)
-        ''', (user_id, datetime.now().isoformat(), banned_by))
-        conn.commit()
+        with conn:
+            cursor.execute('''
+                INSERT INTO banned_makers (user_id, banned_at, banned_by)
+                VALUES (?, strftime('%Y-%m-%dT%H:%M:%f', 'now', 'localtime'), ?)
+                ON CONFLICT(user_id)
+                DO UPDATE SET banned_at = excluded.banned_at, banned_by = excluded.banned_by
+            ''', (user_id, banned_by))
+        is_maker_banned.cache_clear()
         return True
     except Exception as e:
         logger.error(f"Error banning maker: {e}")
         return False
-    finally:
-        conn.close()
 
 def unban_maker(user_id: int):
     """Unban a user from making bots"""
     conn = get_connection()
     cursor = conn.cursor()
-    cursor.execute('DELETE FROM banned_makers WHERE user_id = ?', (user_id,))
-    conn.commit()
+    with conn:
+        cursor.execute('DELETE FROM banned_makers WHERE user_id = ?', (user_id,))
+    is_maker_banned.cache_clear()
     affected = cursor.rowcount
-    conn.close()
     return affected > 0
 
+@lru_cache(maxsize=READ_CACHE_SIZE)
 def is_maker_banned(user_id: int) -> bool:
     """Check if user is banned from making bots"""
     conn = get_connection()
     cursor = conn.cursor()
-    cursor.execute('SELECT 1 FROM banned_makers WHERE user_id = ?', (user_id,))
+    cursor.execute(SQL_IS_MAKER_BANNED, (user_id,))
     row = cursor.fetchone()
-    conn.close()
     return row is not None
 
 def get_all_banned_makers() -> List[int]:
@@ -424,7 +633,6 @@ def get_all_banned_makers() -> List[int]:
     cursor = conn.cursor()
     cursor.execute('SELECT user_id FROM banned_makers')
     rows = cursor.fetchall()
-    conn.close()
     return [row['user_id'] for row in rows]
 
 
@@ -435,34 +643,38 @@ def set_fake_sub(bot_token: str, enabled: bool, message: str = None):
     conn = get_connection()
     cursor = conn.cursor()
     try:
-        cursor.execute('''
-            INSERT OR REPLACE INTO fake_subs (bot_token, enabled, message, updated_at)
-            VALUES (?, ?, ?, ?)
-        ''', (bot_token, 1 if enabled else 0, message, datetime.now().isoformat()))
-        conn.commit()
+        with conn:
+            cursor.execute('''
+                INSERT INTO fake_subs (bot_token, enabled, message, updated_at)
+                VALUES (?, ?, ?, strftime('%Y-%m-%dT%H:%M:%f', 'now', 'localtime'))
+                ON CONFLICT(bot_token)
+                DO UPDATE SET enabled = excluded.enabled, message = excluded.message, updated_at = excluded.updated_at
+            ''', (bot_token, 1 if enabled else 0, message))
+        _get_fake_sub.cache_clear()
         return True
     except Exception as e:
         logger.error(f"Error setting fake sub: {e}")
         return False
-    finally:
-        conn.close()
 
-def get_fake_sub(bot_token: str) -> Optional[Dict]:
-    """Get fake subscription settings for a bot"""
+@lru_cache(maxsize=READ_CACHE_SIZE)
+def _get_fake_sub(bot_token: str) -> Optional[Dict]:
     conn = get_connection()
     cursor = conn.cursor()
-    cursor.execute('SELECT * FROM fake_subs WHERE bot_token = ?', (bot_token,))
+    cursor.execute(SQL_GET_FAKE_SUB, (bot_token,))
     row = cursor.fetchone()
-    conn.close()
     return dict(row) if row else None
 
+def get_fake_sub(bot_token: str) -> Optional[Dict]:
+    """Get fake subscription settings (enabled, message) for a bot"""
+    fake_sub = _get_fake_sub(bot_token)
+    return dict(fake_sub) if fake_sub else None
+
 def get_all_fake_subs() -> List[Dict]:
     """Get all fake subscription settings"""
     conn = get_connection()
     cursor = conn.cursor()
     cursor.execute('SELECT * FROM fake_subs WHERE enabled = 1')
     rows = cursor.fetchall()
-    conn.close()
     return [dict(row) for row in rows]
 
 
@@ -473,46 +685,29 @@ def add_memory(bot_token: str, user_id: int, role: str, content: str):
     conn = get_connection()
     cursor = conn.cursor()
     try:
-        cursor.execute('''
-            INSERT INTO remember (bot_token, user_id, role, content, created_at)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (bot_token, user_id, role, content, datetime.now().isoformat()))
-        conn.commit()
-        cursor.execute('''
-            DELETE FROM remember WHERE bot_token = ? AND user_id = ? AND id NOT IN (
-                SELECT id FROM remember WHERE bot_token = ? AND user_id = ?
-                ORDER BY created_at DESC LIMIT 20
-            )
-        ''', (bot_token, user_id, bot_token, user_id))
-        conn.commit()
+        with conn:
+            cursor.execute(SQL_ADD_MEMORY, (bot_token, user_id, role, content))
+            cursor.execute(SQL_TRIM_MEMORY, (bot_token, user_id, bot_token, user_id))
     except Exception as e:
         logger.error(f"Error adding memory: {e}")
-    finally:
-        conn.close()
 
 def get_memory(bot_token: str, user_id: int, limit: int = 20) -> List[Dict]:
     """Get AI memory for a user"""
     conn = get_connection()
     cursor = conn.cursor()
-    cursor.execute('''
-        SELECT role, content FROM remember 
-        WHERE bot_token = ? AND user_id = ?
-        ORDER BY created_at DESC LIMIT ?
-    ''', (bot_token, user_id, limit))
+    cursor.execute(SQL_GET_MEMORY, (bot_token, user_id, limit))
     rows = cursor.fetchall()
-    conn.close()
     return [{"role": row['role'], "content": row['content']} for row in reversed(rows)]
 
 def clear_memory(bot_token: str, user_id: int = None):
     """Clear AI memory"""
     conn = get_connection()
     cursor = conn.cursor()
-    if user_id:
-        cursor.execute('DELETE FROM remember WHERE bot_token = ? AND user_id = ?', (bot_token, user_id))
-    else:
-        cursor.execute('DELETE FROM remember WHERE bot_token = ?', (bot_token,))
-    conn.commit()
-    conn.close()
+    with conn:
+        if user_id:
+            cursor.execute('DELETE FROM remember WHERE bot_token = ? AND user_id = ?', (bot_token, user_id))
+        else:
+            cursor.execute('DELETE FROM remember WHERE bot_token = ?', (bot_token,))
 
 
 # ============== ADHKAR SCHEDULES ==============
@@ -522,17 +717,18 @@ def add_adhkar_schedule(bot_token: str, chat_id: int, interval_minutes: int, end
     conn = get_connection()
     cursor = conn.cursor()
     try:
-        cursor.execute('''
-            INSERT OR REPLACE INTO adhkar_schedules (bot_token, chat_id, interval_minutes, end_time, created_at)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (bot_token, chat_id, interval_minutes, end_time, datetime.now().isoformat()))
-        conn.commit()
+        with conn:
+            cursor.execute('''
+                INSERT INTO adhkar_schedules (bot_token, chat_id, interval_minutes, end_time, created_at)
+                VALUES (?, ?, ?, ?, strftime('%Y-%m-%dT%H:%M:%f', 'now', 'localtime'))
+                ON CONFLICT(bot_token, chat_id)
+                DO UPDATE SET interval_minutes = excluded.interval_minutes, end_time = excluded.end_time,
+                              created_at = excluded.created_at
+            ''', (bot_token, chat_id, interval_minutes, end_time))
         return True
     except Exception as e:
         logger.error(f"Error adding adhkar schedule: {e}")
         return False
-    finally:
-        conn.close()
 
 def get_adhkar_schedules(bot_token: str = None) -> List[Dict]:
     """Get adhkar schedules"""
@@ -543,16 +739,14 @@ def get_adhkar_schedules(bot_token: str = None) -> List[Dict]:
     else:
         cursor.execute('SELECT * FROM adhkar_schedules')
     rows = cursor.fetchall()
-    conn.close()
     return [dict(row) for row in rows]
 
 def remove_adhkar_schedule(bot_token: str, chat_id: int):
     """Remove adhkar schedule"""
     conn = get_connection()
     cursor = conn.cursor()
-    cursor.execute('DELETE FROM adhkar_schedules WHERE bot_token = ? AND chat_id = ?', (bot_token, chat_id))
-    conn.commit()
-    conn.close()
+    with conn:
+        cursor.execute('DELETE FROM adhkar_schedules WHERE bot_token = ? AND chat_id = ?', (bot_token, chat_id))
 
 
 # ============== GUARD DATA ==============
@@ -564,54 +758,55 @@ def get_guard_kick_count(bot_token: str, chat_id: int, admin_id: int) -> int:
     cursor.execute('SELECT kick_count FROM guard_data WHERE bot_token = ? AND chat_id = ? AND admin_id = ?', 
                    (bot_token, chat_id, admin_id))
     row = cursor.fetchone()
-    conn.close()
     return row['kick_count'] if row else 0
 
 def increment_guard_kick(bot_token: str, chat_id: int, admin_id: int) -> int:
     """Increment kick count for an admin and return new count"""
     conn = get_connection()
     cursor = conn.cursor()
-    cursor.execute('''
-        INSERT INTO guard_data (bot_token, chat_id, admin_id, kick_count)
-        VALUES (?, ?, ?, 1)
-        ON CONFLICT(bot_token, chat_id, admin_id) 
-        DO UPDATE SET kick_count = kick_count + 1
-    ''', (bot_token, chat_id, admin_id))
-    conn.commit()
-    cursor.execute('SELECT kick_count FROM guard_data WHERE bot_token = ? AND chat_id = ? AND admin_id = ?',
-                   (bot_token, chat_id, admin_id))
-    row = cursor.fetchone()
-    conn.close()
-    return row['kick_count'] if row else 1
+    with conn:
+        cursor.execute('''
+            INSERT INTO guard_data (bot_token, chat_id, admin_id, kick_count)
+            VALUES (?, ?, ?, 1)
+            ON CONFLICT(bot_token, chat_id, admin_id) 
+            DO UPDATE SET kick_count = kick_count + 1
+            RETURNING kick_count
+        ''', (bot_token, chat_id, admin_id))
+        row = cursor.fetchone()
+    return row['kick_count']
 
 def reset_guard_kicks(bot_token: str, chat_id: int, admin_id: int):
     """Reset kick count for an admin"""
     conn = get_connection()
     cursor = conn.cursor()
-    cursor.execute('DELETE FROM guard_data WHERE bot_token = ? AND chat_id = ? AND admin_id = ?',
-                   (bot_token, chat_id, admin_id))
-    conn.commit()
-    conn.close()
+    with conn:
+        cursor.execute('DELETE FROM guard_data WHERE bot_token = ? AND chat_id = ? AND admin_id = ?',
+                       (bot_token, chat_id, admin_id))
 
-def get_guard_settings(bot_token: str, chat_id: int) -> Dict:
-    """Get guard settings for a chat"""
+@lru_cache(maxsize=READ_CACHE_SIZE)
+def _get_guard_settings(bot_token: str, chat_id: int) -> Dict:
     conn = get_connection()
     cursor = conn.cursor()
-    cursor.execute('SELECT * FROM guard_settings WHERE bot_token = ? AND chat_id = ?', (bot_token, chat_id))
+    cursor.execute(SQL_GET_GUARD_SETTINGS, (bot_token, chat_id))
     row = cursor.fetchone()
-    conn.close()
     return dict(row) if row else {"kick_limit": 5}
 
+def get_guard_settings(bot_token: str, chat_id: int) -> Dict:
+    """Get guard settings for a chat"""
+    return dict(_get_guard_settings(bot_token, chat_id))
+
 def set_guard_kick_limit(bot_token: str, chat_id: int, limit: int):
     """Set kick limit for a chat"""
     conn = get_connection()
     cursor = conn.cursor()
-    cursor.execute('''
-        INSERT OR REPLACE INTO guard_settings (bot_token, chat_id, kick_limit)
-        VALUES (?, ?, ?)
-    ''', (bot_token, chat_id, limit))
-    conn.commit()
-    conn.close()
+    with conn:
+        cursor.execute('''
+            INSERT INTO guard_settings (bot_token, chat_id, kick_limit)
+            VALUES (?, ?, ?)
+            ON CONFLICT(bot_token, chat_id)
+            DO UPDATE SET kick_limit = excluded.kick_limit
+        ''', (bot_token, chat_id, limit))
+    _get_guard_settings.cache_clear()
 
 
 # ============== STATISTICS ==============
@@ -621,38 +816,19 @@ def get_statistics() -> Dict:
     conn = get_connection()
     cursor = conn.cursor()
     
-    cursor.execute('SELECT COUNT(*) FROM members')
-    total_members = cursor.fetchone()[0]
-    
-    cursor.execute('SELECT COUNT(*) FROM bots')
-    total_bots = cursor.fetchone()[0]
-    
-    cursor.execute('SELECT COUNT(*) FROM bots WHERE active = 1')
-    active_bots = cursor.fetchone()[0]
-    
-    cursor.execute('SELECT COUNT(*) FROM bot_users')
-    total_bot_users = cursor.fetchone()[0]
-    
-    cursor.execute('SELECT COUNT(*) FROM remember')
-    total_messages = cursor.fetchone()[0]
-    
     cursor.execute('''
-        SELECT bot_username, users_count FROM bots 
-        ORDER BY users_count DESC LIMIT 1
+        SELECT
+            (SELECT COUNT(*) FROM members) AS total_members,
+            (SELECT COUNT(*) FROM bots) AS total_bots,
+            (SELECT COUNT(*) FROM bots WHERE active = 1) AS active_bots,
+            (SELECT COUNT(*) FROM bot_users) AS total_bot_users,
+            (SELECT COUNT(*) FROM remember) AS total_messages,
+            (SELECT bot_username FROM bots ORDER BY users_count DESC LIMIT 1) AS most_active_bot,
+            (SELECT users_count FROM bots ORDER BY users_count DESC LIMIT 1) AS most_active_users
     ''')
-    most_active = cursor.fetchone()
-    
-    conn.close()
-    
-    return {
-        "total_members": total_members,
-        "total_bots": total_bots,
-        "active_bots": active_bots,
-        "total_bot_users": total_bot_users,
-        "total_messages": total_messages,
-        "most_active_bot": most_active['bot_username'] if most_active else None,
-        "most_active_users": most_active['users_count'] if most_active else 0
-    }
+    stats = dict(cursor.fetchone())
+    stats["most_active_users"] = stats["most_active_users"] or 0
+    return stats
 
 
 # ============== CLEAR DATABASE ==============
@@ -663,12 +839,18 @@ def clear_all_data():
     cursor = conn.cursor()
     tables = ['members', 'bots', 'bot_users', 'developers', 'banned_makers', 
               'fake_subs', 'remember', 'adhkar_schedules', 'guard_data', 'guard_settings']
-    for table in tables:
-        cursor.execute(f'DELETE FROM {table}')
-    conn.commit()
-    conn.close()
+    # Dropping and recreating skips the per-row triggers a DELETE would fire,
+    # all inside one transaction
+    with conn:
+        cursor.execute('BEGIN')
+        for table in tables:
+            cursor.execute(f'DROP TABLE IF EXISTS {table}')
+        _create_schema(cursor)
+    cursor.execute('VACUUM')
+    _get_fake_sub.cache_clear()
+    _get_guard_settings.cache_clear()
+    is_developer.cache_clear()
+    is_maker_banned.cache_clear()
+    _banned_cache.clear()
     logger.info("All data cleared from database")
 
-
-# Initialize on import
-init_database()
@@ -3,10 +3,12 @@ Advanced Logging System for Telegram Bot Factory
 Provides separate log files for different components
 """
 
+import atexit
 import logging
 import os
+import queue
 from datetime import datetime
-from logging.handlers import RotatingFileHandler
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
 
 LOGS_DIR = "logs"
 os.makedirs(LOGS_DIR, exist_ok=True)
@@ -14,8 +16,82 @@ os.makedirs(LOGS_DIR, exist_ok=True)
 LOG_FORMAT = "%(asctime)s - [%(levelname)s] - %(name)s - %(message)s"
 DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
 
+# How many records a file handler writes between rollover size checks
+ROLLOVER_CHECK_EVERY = 100
+
+
+class BatchedRotatingFileHandler(RotatingFileHandler):
+    """RotatingFileHandler that checks the file size every `check_every` records instead of on each one"""
+    
+    def __init__(self, *args, check_every: int = ROLLOVER_CHECK_EVERY, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.check_every = check_every
+        self._records_since_check = 0
+    
+    def shouldRollover(self, record) -> bool:
+        self._records_since_check += 1
+        if self._records_since_check < self.check_every:
+            return False
+        self._records_since_check = 0
+        return super().shouldRollover(record)
+
+
+class DeferredQueueHandler(QueueHandler):
+    """QueueHandler that enqueues the raw record so the listener thread does all the formatting"""
+    
+    def prepare(self, record):
+        # The queue is in-process, so the record needs no pickling or pre-rendering
+        return record
+
+
+class LoggerNameFilter(logging.Filter):
+    """Pass only records from the loggers (and their children) registered with `add`"""
+    
+    def __init__(self):
+        super().__init__()
+        self.names = set()
+    
+    def add(self, name: str):
+        self.names.add(name)
+    
+    def filter(self, record) -> bool:
+        return any(record.name == name or record.name.startswith(name + ".") for name in self.names)
+
+
+# One handler per log file, shared by every logger that writes to it
+_file_handlers = {}
+
+# A single queue and listener thread serve every logger; the listener owns all handlers
+_console_handler = logging.StreamHandler()
+_console_handler.setLevel(logging.INFO)
+_console_handler.setFormatter(logging.Formatter(LOG_FORMAT, DATE_FORMAT))
+
+_log_queue = queue.Queue(-1)
+_log_listener = QueueListener(_log_queue, _console_handler, respect_handler_level=True)
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
+def get_file_handler(log_file: str, level=logging.INFO) -> RotatingFileHandler:
+    """Get the shared rotating handler for a log file, creating it on first use"""
+    file_path = os.path.join(LOGS_DIR, log_file)
+    file_handler = _file_handlers.get(file_path)
+    if file_handler is None:
+        file_handler = BatchedRotatingFileHandler(
+            file_path,
+            maxBytes=5*1024*1024,
+            backupCount=5,
+            encoding='utf-8'
+        )
+        file_handler.setLevel(level)
+        file_handler.setFormatter(logging.Formatter(LOG_FORMAT, DATE_FORMAT))
+        file_handler.addFilter(LoggerNameFilter())
+        _file_handlers[file_path] = file_handler
+        # The listener re-reads this tuple for every record, so swapping it in is safe
+        _log_listener.handlers = _log_listener.handlers + (file_handler,)
+    return file_handler
+
 def setup_logger(name: str, log_file: str, level=logging.INFO) -> logging.Logger:
-    """Setup a logger with file and console handlers"""
+    """Setup a logger whose file and console output is written by the shared listener thread"""
     
     logger = logging.getLogger(name)
     logger.setLevel(level)
@@ -23,22 +99,14 @@ def setup_logger(name: str, log_file: str, level=logging.INFO) -> logging.Logger
     if logger.handlers:
         return logger
     
-    file_path = os.path.join(LOGS_DIR, log_file)
-    file_handler = RotatingFileHandler(
-        file_path,
-        maxBytes=5*1024*1024,
-        backupCount=5,
-        encoding='utf-8'
-    )
-    file_handler.setLevel(level)
-    file_handler.setFormatter(logging.Formatter(LOG_FORMAT, DATE_FORMAT))
-    
-    console_handler = logging.StreamHandler()
-    console_handler.setLevel(logging.INFO)
-    console_handler.setFormatter(logging.Formatter(LOG_FORMAT, DATE_FORMAT))
+    file_handler = get_file_handler(log_file, level)
+    for log_filter in file_handler.filters:
+        if isinstance(log_filter, LoggerNameFilter):
+            log_filter.add(name)
     
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
+    # Log calls only enqueue the record; the listener does message/traceback formatting and I/O
+    logger.addHandler(DeferredQueueHandler(_log_queue))
+    logger.propagate = False
     
     return logger
 
@@ -56,46 +124,46 @@ def log_main(message: str, level: str = "info"):
 
 def log_child(bot_name: str, message: str, level: str = "info"):
     """Log message for child bots"""
-    getattr(child_logger, level.lower())(f"[@{bot_name}] {message}")
+    getattr(child_logger, level.lower())("[@%s] %s", bot_name, message)
 
 def log_error(source: str, error: Exception, context: str = ""):
     """Log error with full details"""
-    error_msg = f"[{source}] {type(error).__name__}: {str(error)}"
     if context:
-        error_msg += f" | Context: {context}"
-    error_logger.error(error_msg, exc_info=True)
-    main_logger.error(error_msg)
+        error_msg, args = "[%s] %s: %s | Context: %s", (source, type(error).__name__, error, context)
+    else:
+        error_msg, args = "[%s] %s: %s", (source, type(error).__name__, error)
+    error_logger.error(error_msg, *args, exc_info=True)
+    main_logger.error(error_msg, *args)
 
 def log_user_action(user_id: int, action: str, details: str = ""):
     """Log user actions"""
-    msg = f"User {user_id}: {action}"
     if details:
-        msg += f" | {details}"
-    main_logger.info(msg)
+        main_logger.info("User %s: %s | %s", user_id, action, details)
+    else:
+        main_logger.info("User %s: %s", user_id, action)
 
 def log_bot_created(bot_type: str, bot_username: str, owner_id: int):
     """Log bot creation"""
-    main_logger.info(f"NEW BOT CREATED: Type={bot_type}, Username=@{bot_username}, Owner={owner_id}")
+    main_logger.info("NEW BOT CREATED: Type=%s, Username=@%s, Owner=%s", bot_type, bot_username, owner_id)
 
 def log_broadcast(source: str, success: int, failed: int, bot_name: str = None):
     """Log broadcast results"""
     if bot_name:
-        msg = f"BROADCAST from @{bot_name}: Success={success}, Failed={failed}"
+        main_logger.info("BROADCAST from @%s: Success=%s, Failed=%s", bot_name, success, failed)
     else:
-        msg = f"BROADCAST from {source}: Success={success}, Failed={failed}"
-    main_logger.info(msg)
+        main_logger.info("BROADCAST from %s: Success=%s, Failed=%s", source, success, failed)
 
 def log_startup():
     """Log bot startup"""
     main_logger.info("="*50)
     main_logger.info("BOT FACTORY STARTED")
-    main_logger.info(f"Startup time: {datetime.now().isoformat()}")
+    main_logger.info("Startup time: %s", datetime.now().isoformat())
     main_logger.info("="*50)
 
 def log_child_startup(bot_username: str, bot_type: str):
     """Log child bot startup"""
-    child_logger.info(f"[@{bot_username}] Started - Type: {bot_type}")
+    child_logger.info("[@%s] Started - Type: %s", bot_username, bot_type)
 
 def log_child_error(bot_username: str, error: str):
     """Log child bot error"""
-    child_logger.error(f"[@{bot_username}] ERROR: {error}")
+    child_logger.error("[@%s] ERROR: %s", bot_username, error)